@@ -2,6 +2,8 @@
 Professional Architecture Diagram Generator
 Using Agno Agentic SDK and Google Gemini
 """
+import asyncio
+import concurrent.futures
 import os
 import sys
 from pathlib import Path
@@ -11,8 +13,9 @@ from dotenv import load_dotenv
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
-from architecture_agent import create_architecture_agent, DiagramRequest
-from diagram_generator import DiagramGenerator
+# templates is a lightweight dict module and safe to import eagerly;
+# architecture_agent (agno) and diagram_generator (diagrams/graphviz) are
+# imported lazily inside the handlers that need them to keep cold starts fast
 from templates import get_template_names, get_template
 
 # Load environment variables
@@ -82,10 +85,75 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+# st.fragment stabilized in Streamlit 1.37 (1.33-1.36 shipped it as
+# st.experimental_fragment); on anything older fall back to a plain
+# function call so the app still imports and runs, just without scoped reruns
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
+
+
+# Selectbox options, hoisted so they aren't rebuilt on every rerun; the
+# index dicts make the default-selection lookup O(1) instead of a scan
+ARCHITECTURE_TYPES = ("cloud", "microservices", "serverless", "data", "ml", "event-driven", "devops", "network")
+ARCHITECTURE_TYPE_INDEX = {v: i for i, v in enumerate(ARCHITECTURE_TYPES)}
+CLOUD_PROVIDERS = ("AWS", "GCP", "Azure", "Generic")
+CLOUD_PROVIDER_INDEX = {v: i for i, v in enumerate(CLOUD_PROVIDERS)}
+
+
+# cache_resource rather than cache_data: templates are shared read-only
+# mapping proxies, so there's nothing to serialize — just hand back the
+# same frozen object every time
+@st.cache_resource(show_spinner=False)
+def _cached_template_names():
+    """Fetch the template names once per process"""
+    return get_template_names()
+
+
+@st.cache_resource(show_spinner=False)
+def _cached_template(name: str):
+    """Fetch a template mapping once per process"""
+    return get_template(name)
+
+
+@st.cache_resource(show_spinner=False)
+def get_render_executor():
+    """Shared thread pool so diagram rendering runs off the Streamlit thread"""
+    return concurrent.futures.ThreadPoolExecutor(max_workers=4)
+
+
+@st.cache_resource(show_spinner=False)
+def get_agent(api_key: str):
+    """Build the Agno agent once per API key and reuse it across reruns"""
+    from architecture_agent import create_architecture_agent
+    return create_architecture_agent(api_key)
+
+
+@st.cache_data(show_spinner=False, max_entries=64, ttl=3600)
+def cached_generate(api_key: str, description: str, architecture_type: str,
+                    cloud_provider: str | None, components: str | None,
+                    _on_chunk=None):
+    """Memoize Gemini responses so identical requests skip the network round-trip
+
+    The underscore-prefixed callback is excluded from the cache key; on a
+    cache miss the model output is streamed through it as it arrives.
+    """
+    from architecture_agent import DiagramRequest
+
+    agent = get_agent(api_key)
+    request = DiagramRequest(
+        description=description,
+        architecture_type=architecture_type,
+        cloud_provider=cloud_provider,
+        components=components
+    )
+    return asyncio.run(agent.astream_diagram_code(request, on_chunk=_on_chunk))
+
+
 def initialize_session_state():
     """Initialize session state variables"""
     if "generated_diagram" not in st.session_state:
         st.session_state.generated_diagram = None
+    if "diagram_bytes" not in st.session_state:
+        st.session_state.diagram_bytes = None
     if "diagram_response" not in st.session_state:
         st.session_state.diagram_response = None
     if "api_key_verified" not in st.session_state:
@@ -97,6 +165,259 @@ def verify_api_key(api_key: str) -> bool:
     return bool(api_key and api_key.strip() and api_key != "your_google_api_key_here")
 
 
+@_fragment
+def render_generate_tab(google_api_key, use_template, selected_template):
+    """Generate tab: inputs, generate button, and the rendered diagram
+
+    Wrapped in st.fragment so widget changes here rerun only this tab
+    instead of the whole script.
+    """
+    col1, col2 = st.columns([2, 1])
+
+    with col1:
+        st.subheader("Diagram Requirements")
+
+        # If template selected, populate fields
+        if use_template and selected_template:
+            template = _cached_template(selected_template)
+            st.info(f"📋 Using template: **{selected_template}**")
+        else:
+            template = {}
+
+        # Input fields
+        description = st.text_area(
+            "Describe your architecture",
+            value=template.get("description", ""),
+            height=120,
+            placeholder="E.g., A scalable e-commerce platform with user authentication, product catalog, shopping cart, payment processing, and order management",
+            help="Provide a detailed description of the architecture you want to create"
+        )
+
+        col_a, col_b = st.columns(2)
+        with col_a:
+            architecture_type = st.selectbox(
+                "Architecture Type",
+                options=ARCHITECTURE_TYPES,
+                index=ARCHITECTURE_TYPE_INDEX.get(template.get("architecture_type"), 0),
+                help="Type of architecture pattern"
+            )
+
+        with col_b:
+            cloud_provider = st.selectbox(
+                "Cloud Provider",
+                options=CLOUD_PROVIDERS,
+                index=CLOUD_PROVIDER_INDEX.get(template.get("cloud_provider"), 0),
+                help="Select your cloud provider"
+            )
+
+        components = st.text_input(
+            "Specific Components (optional)",
+            value=template.get("components", ""),
+            placeholder="E.g., Lambda, API Gateway, DynamoDB, S3",
+            help="List specific services or components to include"
+        )
+
+    with col2:
+        st.subheader("Actions")
+        st.markdown("---")
+
+        generate_button = st.button(
+            "🚀 Generate Diagram",
+            type="primary",
+            disabled=not description or not st.session_state.api_key_verified,
+            use_container_width=True
+        )
+
+        if st.session_state.diagram_bytes:
+            st.download_button(
+                label="💾 Download Diagram",
+                data=st.session_state.diagram_bytes,
+                file_name="architecture_diagram.png",
+                mime="image/png",
+                use_container_width=True
+            )
+
+        st.markdown("---")
+        st.markdown("### 💡 Tips")
+        st.markdown("""
+        - Be specific about your requirements
+        - Mention data flows and interactions
+        - Include security and scaling needs
+        - Specify integration points
+        """)
+
+    # Repeated clicks with identical inputs reuse the stored result
+    # without any network hop
+    input_hash = hash((description, architecture_type, cloud_provider, components))
+    inputs_unchanged = (
+        st.session_state.get("_last_input_hash") == input_hash
+        and st.session_state.generated_diagram is not None
+    )
+
+    if generate_button and inputs_unchanged:
+        st.success("✅ Inputs unchanged — showing the existing diagram")
+
+    # Generate diagram
+    if generate_button and not inputs_unchanged:
+        with st.spinner("🤖 AI Agent is designing your architecture..."):
+            try:
+                # Stream the model output into a placeholder as it arrives
+                stream_placeholder = st.empty()
+
+                # Generate diagram code (served from cache for repeated
+                # inputs; strip free-text fields so stray whitespace
+                # doesn't cause a cache miss)
+                response = cached_generate(
+                    google_api_key,
+                    description.strip(),
+                    architecture_type,
+                    cloud_provider if cloud_provider != "Generic" else None,
+                    components.strip() or None,
+                    _on_chunk=lambda buf: stream_placeholder.code(buf, language="python")
+                )
+                stream_placeholder.empty()
+                st.session_state.diagram_response = response
+
+                # Display progress
+                st.success("✅ Diagram code generated!")
+
+            except Exception as e:
+                st.error(f"❌ Error generating diagram code: {str(e)}")
+                st.stop()
+
+        with st.spinner("🎨 Creating professional diagram..."):
+            try:
+                # Generate the actual diagram
+                from diagram_generator import DiagramGenerator
+
+                generator = DiagramGenerator(output_dir="outputs")
+
+                # Render on the shared pool; block only when the result
+                # is actually needed for display
+                future = get_render_executor().submit(
+                    generator.generate_diagram,
+                    response.diagram_code,
+                    output_filename="architecture_diagram"
+                )
+                success, output_path, error = future.result()
+
+                if success:
+                    st.session_state.generated_diagram = output_path
+                    # Read the PNG once here so reruns don't hit the disk
+                    with open(output_path, "rb") as f:
+                        st.session_state.diagram_bytes = f.read()
+                    st.session_state._last_input_hash = input_hash
+                    st.balloons()
+                    st.success("🎉 Diagram generated successfully!")
+                else:
+                    st.error(f"❌ Error generating diagram: {error}")
+                    st.stop()
+
+            except Exception as e:
+                st.error(f"❌ Error creating diagram: {str(e)}")
+                st.stop()
+
+    # Display generated diagram
+    if st.session_state.generated_diagram:
+        st.divider()
+        st.subheader("📊 Generated Architecture Diagram")
+
+        # Show diagram
+        st.image(
+            st.session_state.generated_diagram,
+            use_container_width=True,
+            caption="Professional Architecture Diagram"
+        )
+
+        # Show description and details
+        if st.session_state.diagram_response:
+            col1, col2 = st.columns(2)
+
+            with col1:
+                st.markdown("#### 📝 Description")
+                st.info(st.session_state.diagram_response.description)
+
+                st.markdown("#### 🔧 Components")
+                for component in st.session_state.diagram_response.components:
+                    st.markdown(f"- {component}")
+
+            with col2:
+                st.markdown("#### ✨ Best Practices Applied")
+                for practice in st.session_state.diagram_response.best_practices:
+                    st.markdown(f"- {practice}")
+
+
+@_fragment
+def render_code_tab():
+    """View Code tab: the generated diagrams-library source"""
+    st.subheader("📖 Generated Python Code")
+
+    if st.session_state.diagram_response:
+        st.markdown("This is the Python code generated to create your diagram:")
+
+        st.code(
+            st.session_state.diagram_response.diagram_code,
+            language="python",
+            line_numbers=True
+        )
+
+        st.download_button(
+            label="💾 Download Code",
+            data=st.session_state.diagram_response.diagram_code,
+            file_name="architecture_diagram.py",
+            mime="text/x-python",
+        )
+    else:
+        st.info("Generate a diagram first to see the code here.")
+
+
+@_fragment
+def render_gallery_tab(google_api_key):
+    """Gallery tab: template browser and concurrent prewarm"""
+    st.subheader("📚 Architecture Patterns Gallery")
+
+    st.markdown("""
+    Explore common architecture patterns and templates:
+    """)
+
+    # Display templates in a grid
+    templates = _cached_template_names()
+
+    # Fan all template prompts out to Gemini concurrently so later
+    # clicks on any template are served from the response cache
+    if st.button("🔥 Prewarm All Templates"):
+        with st.spinner("🤖 Generating all template diagrams concurrently..."):
+            async def _prewarm():
+                await asyncio.gather(*(
+                    asyncio.to_thread(
+                        cached_generate,
+                        google_api_key,
+                        template["description"],
+                        template["architecture_type"],
+                        template.get("cloud_provider"),
+                        template.get("components")
+                    )
+                    for template in map(_cached_template, templates)
+                ))
+
+            try:
+                asyncio.run(_prewarm())
+                st.success("✅ All templates prewarmed!")
+            except Exception as e:
+                st.error(f"❌ Error prewarming templates: {str(e)}")
+
+    cols = st.columns(2)
+
+    for idx, template_name in enumerate(templates):
+        with cols[idx % 2]:
+            with st.expander(f"📐 {template_name}"):
+                template = _cached_template(template_name)
+                st.markdown(f"**Description:** {template['description']}")
+                st.markdown(f"**Type:** {template['architecture_type']}")
+                st.markdown(f"**Provider:** {template.get('cloud_provider', 'N/A')}")
+                st.markdown(f"**Components:** {template.get('components', 'N/A')}")
+
+
 def main():
     """Main application"""
     initialize_session_state()
@@ -120,7 +441,10 @@ def main():
             help="Enter your Google AI API key for Gemini"
         )
 
-        st.session_state.api_key_verified = verify_api_key(google_api_key)
+        # Only re-verify (and rewrite session state) when the key changes
+        if st.session_state.get("_last_api_key") != google_api_key:
+            st.session_state._last_api_key = google_api_key
+            st.session_state.api_key_verified = verify_api_key(google_api_key)
 
         if not st.session_state.api_key_verified:
             st.warning("⚠️ Please enter your Google API key to continue")
@@ -137,7 +461,7 @@ def main():
 
         selected_template = None
         if use_template:
-            template_names = get_template_names()
+            template_names = _cached_template_names()
             selected_template = st.selectbox(
                 "Choose a template",
                 options=template_names,
@@ -157,204 +481,18 @@ def main():
         Created with ❤️ by Claude
         """)
 
-    # Main content area
+    # Main content area; each tab body is an st.fragment so interactions
+    # inside one tab don't re-render the others
     tab1, tab2, tab3 = st.tabs(["🎨 Generate Diagram", "📖 View Code", "📚 Gallery"])
 
     with tab1:
-        col1, col2 = st.columns([2, 1])
-
-        with col1:
-            st.subheader("Diagram Requirements")
-
-            # If template selected, populate fields
-            if use_template and selected_template:
-                template = get_template(selected_template)
-                st.info(f"📋 Using template: **{selected_template}**")
-            else:
-                template = {}
-
-            # Input fields
-            description = st.text_area(
-                "Describe your architecture",
-                value=template.get("description", ""),
-                height=120,
-                placeholder="E.g., A scalable e-commerce platform with user authentication, product catalog, shopping cart, payment processing, and order management",
-                help="Provide a detailed description of the architecture you want to create"
-            )
-
-            col_a, col_b = st.columns(2)
-            with col_a:
-                architecture_type = st.selectbox(
-                    "Architecture Type",
-                    options=["cloud", "microservices", "serverless", "data", "ml", "event-driven", "devops", "network"],
-                    index=["cloud", "microservices", "serverless", "data", "ml", "event-driven", "devops", "network"].index(
-                        template.get("architecture_type", "cloud")
-                    ) if template.get("architecture_type") in ["cloud", "microservices", "serverless", "data", "ml", "event-driven", "devops", "network"] else 0,
-                    help="Type of architecture pattern"
-                )
-
-            with col_b:
-                cloud_provider = st.selectbox(
-                    "Cloud Provider",
-                    options=["AWS", "GCP", "Azure", "Generic"],
-                    index=["AWS", "GCP", "Azure", "Generic"].index(
-                        template.get("cloud_provider", "AWS")
-                    ) if template.get("cloud_provider") in ["AWS", "GCP", "Azure", "Generic"] else 0,
-                    help="Select your cloud provider"
-                )
-
-            components = st.text_input(
-                "Specific Components (optional)",
-                value=template.get("components", ""),
-                placeholder="E.g., Lambda, API Gateway, DynamoDB, S3",
-                help="List specific services or components to include"
-            )
-
-        with col2:
-            st.subheader("Actions")
-            st.markdown("---")
-
-            generate_button = st.button(
-                "🚀 Generate Diagram",
-                type="primary",
-                disabled=not description or not st.session_state.api_key_verified,
-                use_container_width=True
-            )
-
-            if st.session_state.generated_diagram:
-                st.download_button(
-                    label="💾 Download Diagram",
-                    data=open(st.session_state.generated_diagram, "rb").read(),
-                    file_name="architecture_diagram.png",
-                    mime="image/png",
-                    use_container_width=True
-                )
-
-            st.markdown("---")
-            st.markdown("### 💡 Tips")
-            st.markdown("""
-            - Be specific about your requirements
-            - Mention data flows and interactions
-            - Include security and scaling needs
-            - Specify integration points
-            """)
-
-        # Generate diagram
-        if generate_button:
-            with st.spinner("🤖 AI Agent is designing your architecture..."):
-                try:
-                    # Create the agent
-                    agent = create_architecture_agent(google_api_key)
-
-                    # Create diagram request
-                    request = DiagramRequest(
-                        description=description,
-                        architecture_type=architecture_type,
-                        cloud_provider=cloud_provider if cloud_provider != "Generic" else None,
-                        components=components if components else None
-                    )
-
-                    # Generate diagram code
-                    response = agent.generate_diagram_code(request)
-                    st.session_state.diagram_response = response
-
-                    # Display progress
-                    st.success("✅ Diagram code generated!")
-
-                except Exception as e:
-                    st.error(f"❌ Error generating diagram code: {str(e)}")
-                    st.stop()
-
-            with st.spinner("🎨 Creating professional diagram..."):
-                try:
-                    # Generate the actual diagram
-                    generator = DiagramGenerator(output_dir="outputs")
-                    success, output_path, error = generator.generate_diagram(
-                        response.diagram_code,
-                        output_filename="architecture_diagram"
-                    )
-
-                    if success:
-                        st.session_state.generated_diagram = output_path
-                        st.balloons()
-                        st.success("🎉 Diagram generated successfully!")
-                    else:
-                        st.error(f"❌ Error generating diagram: {error}")
-                        st.stop()
-
-                except Exception as e:
-                    st.error(f"❌ Error creating diagram: {str(e)}")
-                    st.stop()
-
-        # Display generated diagram
-        if st.session_state.generated_diagram:
-            st.divider()
-            st.subheader("📊 Generated Architecture Diagram")
-
-            # Show diagram
-            st.image(
-                st.session_state.generated_diagram,
-                use_container_width=True,
-                caption="Professional Architecture Diagram"
-            )
-
-            # Show description and details
-            if st.session_state.diagram_response:
-                col1, col2 = st.columns(2)
-
-                with col1:
-                    st.markdown("#### 📝 Description")
-                    st.info(st.session_state.diagram_response.description)
-
-                    st.markdown("#### 🔧 Components")
-                    for component in st.session_state.diagram_response.components:
-                        st.markdown(f"- {component}")
-
-                with col2:
-                    st.markdown("#### ✨ Best Practices Applied")
-                    for practice in st.session_state.diagram_response.best_practices:
-                        st.markdown(f"- {practice}")
+        render_generate_tab(google_api_key, use_template, selected_template)
 
     with tab2:
-        st.subheader("📖 Generated Python Code")
-
-        if st.session_state.diagram_response:
-            st.markdown("This is the Python code generated to create your diagram:")
-
-            st.code(
-                st.session_state.diagram_response.diagram_code,
-                language="python",
-                line_numbers=True
-            )
-
-            st.download_button(
-                label="💾 Download Code",
-                data=st.session_state.diagram_response.diagram_code,
-                file_name="architecture_diagram.py",
-                mime="text/x-python",
-            )
-        else:
-            st.info("Generate a diagram first to see the code here.")
+        render_code_tab()
 
     with tab3:
-        st.subheader("📚 Architecture Patterns Gallery")
-
-        st.markdown("""
-        Explore common architecture patterns and templates:
-        """)
-
-        # Display templates in a grid
-        templates = get_template_names()
-        cols = st.columns(2)
-
-        for idx, template_name in enumerate(templates):
-            with cols[idx % 2]:
-                with st.expander(f"📐 {template_name}"):
-                    template = get_template(template_name)
-                    st.markdown(f"**Description:** {template['description']}")
-                    st.markdown(f"**Type:** {template['architecture_type']}")
-                    st.markdown(f"**Provider:** {template.get('cloud_provider', 'N/A')}")
-                    st.markdown(f"**Components:** {template.get('components', 'N/A')}")
+        render_gallery_tab(google_api_key)
 
 
 if __name__ == "__main__":
@@ -1,18 +1,107 @@
 """
 Architecture Diagram Agent using Agno SDK and Gemini
 """
+import asyncio
 import os
-from typing import Dict, Any, Optional
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Any, Literal, Optional
 from agno import Agent, Runner
 from pydantic import BaseModel, Field
 
+# Static agent instructions, hoisted to module-level tuples so they are
+# built once at import time rather than on every agent construction
+INSTRUCTIONS_CODE: tuple[str, ...] = (
+    "You are an expert solutions architect and diagram designer.",
+    "You create professional, clear, and well-structured architecture diagrams.",
+    "Always follow industry best practices for architecture design.",
+    "Use proper naming conventions and clear component relationships.",
+    "Include security considerations, scalability patterns, and resilience.",
+    "Generate Python code using the 'diagrams' library that creates professional diagrams.",
+    "Ensure the diagram code is complete, runnable, and follows best practices.",
+    "Include relevant components, connections, and groupings (clusters).",
+    "Add appropriate labels, directions, and styling for professional appearance.",
+)
 
-class DiagramRequest(BaseModel):
-    """Model for diagram generation request"""
-    description: str = Field(..., description="Description of the architecture to diagram")
-    architecture_type: str = Field(default="cloud", description="Type of architecture (cloud, microservices, network, etc.)")
-    cloud_provider: Optional[str] = Field(default=None, description="Cloud provider (AWS, GCP, Azure)")
-    components: Optional[str] = Field(default=None, description="Specific components to include")
+INSTRUCTIONS_IMAGE: tuple[str, ...] = (
+    "You are an expert solutions architect and diagram designer.",
+    "You create professional, clear, and well-structured architecture diagrams.",
+    "Always follow industry best practices for architecture design.",
+    "Use proper naming conventions and clear component relationships.",
+    "Include security considerations, scalability patterns, and resilience.",
+    "Write a rich, detailed prompt for an image-generation model that renders the diagram.",
+    "Describe the layout, logical groupings, labels, and connection arrows explicitly.",
+    "Keep the visual style clean, modern, and presentation-ready.",
+)
+
+# Static tails of the request prompt, pre-joined once at import time
+_STATIC_SUFFIX_CODE = "\n".join((
+    "\n\nGenerate complete, runnable Python code using the 'diagrams' library.",
+    "The code should:",
+    "1. Import necessary modules from diagrams library",
+    "2. Create a Diagram object with appropriate name and direction",
+    "3. Define all components with proper icons based on the cloud provider",
+    "4. Use Cluster objects for logical groupings",
+    "5. Connect components with arrows showing data/control flow",
+    "6. Follow architecture best practices",
+    "7. Be production-ready and professional",
+    "\n\nProvide the response in the structured format with:",
+    "- diagram_code: Complete Python code",
+    "- description: Clear explanation of the architecture",
+    "- components: List of all components used",
+    "- best_practices: Architecture best practices applied",
+))
+
+_STATIC_SUFFIX_IMAGE = "\n".join((
+    "\n\nWrite a detailed prompt for an image-generation model that renders this diagram.",
+    "The prompt should:",
+    "1. Describe every component and its icon or visual treatment",
+    "2. Specify the layout direction and logical groupings",
+    "3. Describe the arrows showing data/control flow",
+    "4. Follow architecture best practices",
+    "5. Call for a clean, professional, presentation-ready style",
+    "\n\nProvide the response in the structured format with:",
+    "- image_prompt: Complete image-generation prompt",
+    "- description: Clear explanation of the architecture",
+    "- components: List of all components used",
+    "- best_practices: Architecture best practices applied",
+))
+
+
+# Pre-compiled prompt template; only the four dynamic fields are formatted
+# per request instead of rebuilding and joining a list of parts
+_PROMPT_TMPL = (
+    "Create a professional architecture diagram with the following requirements:\n"
+    "\nDescription: {description}\n"
+    "\nArchitecture Type: {architecture_type}"
+    "{provider_line}{components_line}\n"
+    "{static_suffix}"
+)
+
+
+def _build_prompt(request: "DiagramRequest", static_suffix: str) -> str:
+    """Build the request prompt from the pre-compiled template"""
+    return _PROMPT_TMPL.format_map({
+        "description": request.description,
+        "architecture_type": request.architecture_type,
+        "provider_line": f"\n\nCloud Provider: {request.cloud_provider}" if request.cloud_provider else "",
+        "components_line": f"\n\nSpecific Components: {request.components}" if request.components else "",
+        "static_suffix": static_suffix,
+    })
+
+
+@dataclass(slots=True, frozen=True)
+class DiagramRequest:
+    """Model for diagram generation request
+
+    A plain frozen dataclass rather than a Pydantic model: the fields are
+    simple strings needing no validation, instantiation is far cheaper, and
+    frozen instances are hashable so they work directly as cache keys.
+    """
+    description: str
+    architecture_type: str = "cloud"
+    cloud_provider: Optional[str] = None
+    components: Optional[str] = None
 
 
 class DiagramResponse(BaseModel):
@@ -23,35 +112,59 @@ class DiagramResponse(BaseModel):
     best_practices: list[str] = Field(..., description="Architecture best practices applied")
 
 
+class ImagePromptResponse(BaseModel):
+    """Model for image-prompt generation response"""
+    image_prompt: str = Field(..., description="Prompt for an image-generation model")
+    description: str = Field(..., description="Description of the diagram")
+    components: list[str] = Field(..., description="List of components in the diagram")
+    best_practices: list[str] = Field(..., description="Architecture best practices applied")
+
+
 class ArchitectureAgent:
     """Agent for generating professional architecture diagrams"""
 
-    def __init__(self, google_api_key: str):
-        """Initialize the architecture agent with Gemini"""
+    def __init__(self, google_api_key: str, mode: Literal["code", "image"] = "code"):
+        """Initialize the architecture agent with Gemini
+
+        Args:
+            google_api_key: Google AI API key
+            mode: "code" produces diagrams-library Python code, "image"
+                produces a prompt for an image-generation model
+        """
         self.google_api_key = google_api_key
+        self.mode = mode
+
+        if mode == "code":
+            instructions = INSTRUCTIONS_CODE
+            response_model = DiagramResponse
+            self._static_suffix = _STATIC_SUFFIX_CODE
+        else:
+            instructions = INSTRUCTIONS_IMAGE
+            response_model = ImagePromptResponse
+            self._static_suffix = _STATIC_SUFFIX_IMAGE
+
+        self._response_model = response_model
 
         # Create the Agno agent with Gemini model
         self.agent = Agent(
             name="Architecture Diagram Expert",
             model="gemini/gemini-2.0-flash-exp",
             description="Expert in creating professional architecture diagrams with best practices",
-            instructions=[
-                "You are an expert solutions architect and diagram designer.",
-                "You create professional, clear, and well-structured architecture diagrams.",
-                "Always follow industry best practices for architecture design.",
-                "Use proper naming conventions and clear component relationships.",
-                "Include security considerations, scalability patterns, and resilience.",
-                "Generate Python code using the 'diagrams' library that creates professional diagrams.",
-                "Ensure the diagram code is complete, runnable, and follows best practices.",
-                "Include relevant components, connections, and groupings (clusters).",
-                "Add appropriate labels, directions, and styling for professional appearance.",
-            ],
-            response_model=DiagramResponse,
+            instructions=instructions,
+            response_model=response_model,
             markdown=True,
             show_tool_calls=False,
             api_key=google_api_key
         )
 
+        # Call the Agent directly when it exposes run(); the Runner wrapper
+        # adds an allocation and an extra method hop with nothing gained.
+        # Decide once here rather than per request.
+        if callable(getattr(self.agent, "run", None)):
+            self.runner = self.agent
+        else:
+            self.runner = Runner(agent=self.agent, api_key=google_api_key)
+
     def generate_diagram_code(self, request: DiagramRequest) -> DiagramResponse:
         """Generate architecture diagram code based on request"""
 
@@ -59,66 +172,101 @@ class ArchitectureAgent:
         prompt = self._build_prompt(request)
 
         # Run the agent
-        runner = Runner(agent=self.agent, api_key=self.google_api_key)
-        response = runner.run(prompt)
+        response = self.runner.run(prompt)
+
+        return self._extract_response(response)
 
-        # Extract the response
-        if hasattr(response, 'content'):
-            # If response has structured content
-            return response.content
+    async def agenerate_diagram_code(self, request: DiagramRequest) -> DiagramResponse:
+        """Async variant of generate_diagram_code that doesn't block the event loop"""
+        prompt = self._build_prompt(request)
+
+        # Prefer the Runner's native async API; fall back to running the
+        # blocking call on a worker thread so the caller's loop stays free
+        if hasattr(self.runner, "arun"):
+            response = await self.runner.arun(prompt)
         else:
-            # Fallback to parsing the response
-            return self._parse_response(response)
+            response = await asyncio.to_thread(self.runner.run, prompt)
+
+        return self._extract_response(response)
+
+    async def agenerate_many(self, requests: list[DiagramRequest],
+                             max_concurrency: int = 10) -> list[DiagramResponse]:
+        """Generate responses for several requests concurrently
+
+        Concurrency is bounded by a semaphore so large batches stay within
+        Gemini rate limits.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _one(request: DiagramRequest) -> DiagramResponse:
+            async with semaphore:
+                return await self.agenerate_diagram_code(request)
+
+        return await asyncio.gather(*(_one(r) for r in requests))
+
+    async def astream_diagram_code(self, request: DiagramRequest, on_chunk=None) -> DiagramResponse:
+        """Stream the model output incrementally, parsing the response once at the end
+
+        Args:
+            request: The diagram request
+            on_chunk: Optional callback invoked with the accumulated text after
+                each chunk, for rendering progress in a UI
+        """
+        if not hasattr(self.runner, "astream"):
+            # Runner has no streaming API; fall back to the one-shot async path
+            return await self.agenerate_diagram_code(request)
+
+        prompt = self._build_prompt(request)
+        buffer = ""
+
+        async for chunk in self.runner.astream(prompt):
+            text = getattr(chunk, "text", "") or ""
+            if text:
+                buffer += text
+                if on_chunk:
+                    on_chunk(buffer)
+
+        # Parse the complete JSON into the structured response exactly once
+        return self._response_model.model_validate_json(buffer)
+
+    def generate_image_prompt(self, request: DiagramRequest) -> ImagePromptResponse:
+        """Generate an image-generation prompt based on request (image mode)"""
+        prompt = self._build_prompt(request)
+        response = self.runner.run(prompt)
+
+        return self._extract_response(response)
 
     def _build_prompt(self, request: DiagramRequest) -> str:
         """Build the prompt for the agent"""
-        prompt_parts = [
-            f"Create a professional architecture diagram with the following requirements:",
-            f"\nDescription: {request.description}",
-            f"\nArchitecture Type: {request.architecture_type}",
-        ]
-
-        if request.cloud_provider:
-            prompt_parts.append(f"\nCloud Provider: {request.cloud_provider}")
-
-        if request.components:
-            prompt_parts.append(f"\nSpecific Components: {request.components}")
-
-        prompt_parts.extend([
-            "\n\nGenerate complete, runnable Python code using the 'diagrams' library.",
-            "The code should:",
-            "1. Import necessary modules from diagrams library",
-            "2. Create a Diagram object with appropriate name and direction",
-            "3. Define all components with proper icons based on the cloud provider",
-            "4. Use Cluster objects for logical groupings",
-            "5. Connect components with arrows showing data/control flow",
-            "6. Follow architecture best practices",
-            "7. Be production-ready and professional",
-            "\n\nProvide the response in the structured format with:",
-            "- diagram_code: Complete Python code",
-            "- description: Clear explanation of the architecture",
-            "- components: List of all components used",
-            "- best_practices: Architecture best practices applied"
-        ])
-
-        return "\n".join(prompt_parts)
-
-    def _parse_response(self, response: Any) -> DiagramResponse:
-        """Parse the agent response into DiagramResponse"""
-        # This is a fallback parser if the response isn't already structured
-        if isinstance(response, DiagramResponse):
+        return _build_prompt(request, self._static_suffix)
+
+    def _extract_response(self, response: Any):
+        """Coerce the runner result into the structured response model
+
+        The agent runs with response_model set, so the result is either the
+        structured model itself or raw JSON text conforming to its schema;
+        parse the latter exactly once via model_validate_json.
+        """
+        content = getattr(response, "content", None)
+        if isinstance(content, self._response_model):
+            return content
+        if isinstance(response, self._response_model):
             return response
 
-        # Default response if parsing fails
-        return DiagramResponse(
-            diagram_code="# Error: Could not generate diagram code",
-            description="Error generating diagram",
-            components=[],
-            best_practices=[]
-        )
+        if not isinstance(content, str):
+            content = getattr(response, "text", None) or str(response)
+        return self._response_model.model_validate_json(content)
+
+
+@lru_cache(maxsize=None)
+def _get_agent(api_key: str, mode: Literal["code", "image"]) -> ArchitectureAgent:
+    """One agent per (api_key, mode): keeps the SDK client and its warm
+    HTTPS connection alive across short-lived callers"""
+    return ArchitectureAgent(google_api_key=api_key, mode=mode)
 
 
-def create_architecture_agent(google_api_key: Optional[str] = None) -> ArchitectureAgent:
+def create_architecture_agent(google_api_key: Optional[str] = None,
+                              mode: Literal["code", "image"] = "code") -> ArchitectureAgent:
     """Factory function to create an architecture agent"""
     api_key = google_api_key or os.getenv("GOOGLE_API_KEY")
 
@@ -128,4 +276,4 @@ def create_architecture_agent(google_api_key: Optional[str] = None) -> Architect
             "or pass it as an argument."
         )
 
-    return ArchitectureAgent(google_api_key=api_key)
+    return _get_agent(api_key, mode)
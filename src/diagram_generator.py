@@ -2,12 +2,192 @@
 Diagram Generator Module
 Safely executes generated diagram code and creates professional diagrams
 """
+import asyncio
+import atexit
+import concurrent.futures
+import hashlib
 import os
+import queue
+import re
+import shutil
+import subprocess
 import sys
-import tempfile
+import threading
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Tuple
-import subprocess
+
+# Source for the persistent worker processes: import diagrams once at boot,
+# then loop reading length-prefixed code payloads from stdin and reporting
+# a one-line status (plus traceback on failure) over stdout
+_WORKER_BOOTSTRAP = """\
+import sys, traceback
+import diagrams  # warm import paid once per worker, not per diagram
+try:
+    # Provider node sets used by the built-in templates, imported eagerly
+    # so the first diagram per provider skips the lazy-import hiccup
+    import diagrams.aws.compute, diagrams.aws.database, diagrams.aws.network, diagrams.aws.storage
+    import diagrams.gcp.compute, diagrams.gcp.database
+    import diagrams.azure.compute
+    import diagrams.k8s.compute
+except ImportError:
+    pass
+try:
+    # Tiny warmup render so graphviz's dot binary is already in page cache
+    import os, tempfile
+    from diagrams.generic.blank import Blank
+    with tempfile.TemporaryDirectory() as _d:
+        with diagrams.Diagram("warmup", filename=os.path.join(_d, "warmup"), show=False):
+            Blank("a") >> Blank("b")
+except Exception:
+    pass
+# Keep the real stdout for the status protocol; anything the executed
+# diagram code prints is diverted to stderr so it can't corrupt framing
+_status = sys.stdout
+sys.stdout = sys.stderr
+while True:
+    header = sys.stdin.readline()
+    if not header:
+        break
+    code = sys.stdin.read(int(header))
+    try:
+        exec(compile(code, "<diagram>", "exec"), {"__name__": "__main__"})
+    except BaseException:
+        tb = traceback.format_exc()
+        _status.write("ERR %d\\n" % len(tb))
+        _status.write(tb)
+    else:
+        _status.write("OK\\n")
+    _status.flush()
+"""
+
+
+class _WorkerPool:
+    """Pool of pre-warmed Python workers that have already imported diagrams
+
+    Spawning a fresh interpreter per diagram pays startup plus the
+    diagrams/graphviz import cost every call; these workers pay it once and
+    then execute code payloads from a stdin loop.
+    """
+
+    def __init__(self, size: Optional[int] = None):
+        self._size = size or os.cpu_count() or 2
+        self._idle: "queue.Queue[subprocess.Popen]" = queue.Queue()
+        # One slot per concurrent job; the semaphore both enforces the pool
+        # bound and wakes waiters when a worker dies, replacing an unlocked
+        # spawn counter that raced across dispatch threads
+        self._slots = threading.BoundedSemaphore(self._size)
+        atexit.register(self.close)
+
+    def _spawn(self) -> subprocess.Popen:
+        # No cwd override: prepared code carries an absolute filename, so
+        # workers run wherever the parent does
+        # Pin the pipe encoding on both ends: the length prefixes count
+        # characters, so parent and worker must agree on the codec rather
+        # than each falling back to its locale default
+        return subprocess.Popen(
+            [sys.executable, "-u", "-c", _WORKER_BOOTSTRAP],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            env={**os.environ, "PYTHONIOENCODING": "utf-8"}
+        )
+
+    def run(self, code: str, timeout: float = 30) -> Tuple[bool, Optional[str]]:
+        """Execute code on an idle worker
+
+        Returns:
+            Tuple of (success, error_message)
+        """
+        # Hold a pool slot for the duration of the job; waiters on a
+        # saturated pool block here until someone's finally releases
+        self._slots.acquire()
+        worker = None
+        try:
+            # Reuse an idle worker; spawn lazily while holding the slot, so
+            # live workers never exceed the pool size
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                worker = self._spawn()
+
+            worker.stdin.write(f"{len(code)}\n")
+            worker.stdin.write(code)
+            worker.stdin.flush()
+
+            # Portable timeout: select() only accepts pipe handles on
+            # POSIX, so arm a timer that kills the stuck worker instead —
+            # the kill closes its stdout and unblocks the readline with EOF
+            timed_out = threading.Event()
+
+            def _expire():
+                timed_out.set()
+                worker.kill()
+
+            timer = threading.Timer(timeout, _expire)
+            timer.start()
+            try:
+                status = worker.stdout.readline()
+            finally:
+                timer.cancel()
+            if timed_out.is_set():
+                return False, f"Diagram generation timed out ({timeout:.0f}s limit)"
+
+            if status.startswith("OK"):
+                self._idle.put(worker)
+                worker = None
+                return True, None
+            if status.startswith("ERR"):
+                try:
+                    traceback_text = worker.stdout.read(int(status.split()[1]))
+                except (ValueError, IndexError):
+                    return False, "Diagram worker exited unexpectedly"
+                self._idle.put(worker)
+                worker = None
+                return False, f"Execution error: {traceback_text}"
+
+            # Empty or garbled status means the worker died mid-job
+            return False, "Diagram worker exited unexpectedly"
+        except (BrokenPipeError, OSError) as e:
+            return False, f"Error talking to diagram worker: {str(e)}"
+        finally:
+            # A worker not handed back to the idle queue is stuck, dead, or
+            # in an unknown protocol state: kill it, then release the slot
+            # either way so blocked callers always make progress
+            if worker is not None:
+                worker.kill()
+                worker.wait()
+            self._slots.release()
+
+    def close(self):
+        """Terminate all idle workers"""
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stdin.close()
+            worker.terminate()
+            worker.wait()
+
+
+# One process-wide pool: output locations are absolute, so short-lived
+# DiagramGenerator instances (one per request in the UI) all share the
+# same warm workers regardless of output directory
+_POOL: Optional[_WorkerPool] = None
+
+
+def _get_pool() -> _WorkerPool:
+    global _POOL
+    if _POOL is None:
+        _POOL = _WorkerPool()
+    return _POOL
+
+
+# Upper bound on cached PNGs kept under .cache before the oldest are evicted
+_CACHE_MAX_ENTRIES = 256
 
 
 class DiagramGenerator:
@@ -18,10 +198,22 @@ class DiagramGenerator:
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
 
+        # Resolved once; hot paths reuse this instead of re-resolving
+        self._abs_output_dir = self.output_dir.resolve()
+
+        # Content-addressed cache of rendered PNGs keyed by code hash
+        self._cache_dir = self._abs_output_dir / ".cache"
+        self._cache_dir.mkdir(exist_ok=True)
+
+        # Generated diagrams, maintained incrementally after one lazy
+        # directory scan so gallery refreshes don't re-read the directory
+        self._generated: Optional[set] = None
+
     def generate_diagram(
         self,
         diagram_code: str,
-        output_filename: str = "architecture_diagram"
+        output_filename: str = "architecture_diagram",
+        extra_filenames: Tuple[str, ...] = ()
     ) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Generate a diagram from Python code
@@ -29,99 +221,206 @@ class DiagramGenerator:
         Args:
             diagram_code: Python code that uses diagrams library
             output_filename: Base name for the output file (without extension)
+            extra_filenames: Additional base names to expose the same PNG
+                under; duplicates are hardlinked, not re-rendered
 
         Returns:
             Tuple of (success, output_path, error_message)
         """
         try:
-            # Create a temporary Python file
-            with tempfile.NamedTemporaryFile(
-                mode='w',
-                suffix='.py',
-                delete=False,
-                dir=str(self.output_dir)
-            ) as temp_file:
-                # Modify the code to save to our output directory
-                modified_code = self._prepare_code(diagram_code, output_filename)
-                temp_file.write(modified_code)
-                temp_file_path = temp_file.name
-
-            # Execute the code in a subprocess for safety
-            result = subprocess.run(
-                [sys.executable, temp_file_path],
-                capture_output=True,
-                text=True,
-                timeout=30,
-                cwd=str(self.output_dir)
+            output_path = self._abs_output_dir / f"{output_filename}.png"
+
+            # Identical code renders identical output: serve repeats from
+            # the content-addressed cache with a hardlink instead of
+            # re-executing anything
+            cache_key = hashlib.blake2b(diagram_code.encode(), digest_size=16).hexdigest()
+            cache_path = self._cache_dir / f"{cache_key}.png"
+            if cache_path.exists():
+                self._materialize(cache_path, output_path)
+                self._record_output(output_path, extra_filenames)
+                return True, str(output_path), None
+
+            # Inject the absolute output location so the worker needs no
+            # cwd of its own
+            modified_code = self._prepare_code(
+                diagram_code, str(self._abs_output_dir / output_filename)
             )
 
-            # Clean up the temporary file
-            os.unlink(temp_file_path)
+            # The target name may still be hardlinked to a cache entry from
+            # an earlier render; drop it first so the worker writes a fresh
+            # inode instead of truncating the shared cached PNG in place
+            output_path.unlink(missing_ok=True)
 
-            if result.returncode == 0:
+            # Execute on a pre-warmed worker; no interpreter startup or
+            # diagrams re-import per call
+            success, error = _get_pool().run(modified_code, timeout=30)
+
+            if success:
                 # Find the generated diagram file
-                output_path = self.output_dir / f"{output_filename}.png"
                 if output_path.exists():
+                    self._store_in_cache(output_path, cache_path)
+                    self._record_output(output_path, extra_filenames)
                     return True, str(output_path), None
                 else:
                     return False, None, "Diagram file was not created"
             else:
-                error_msg = result.stderr or result.stdout
-                return False, None, f"Execution error: {error_msg}"
+                return False, None, error
 
-        except subprocess.TimeoutExpired:
-            return False, None, "Diagram generation timed out (30s limit)"
         except Exception as e:
             return False, None, f"Error generating diagram: {str(e)}"
 
+    def _record_output(self, output_path: Path, extra_filenames: Tuple[str, ...] = ()):
+        """Track a produced PNG and hardlink any requested duplicate names"""
+        if self._generated is not None:
+            self._generated.add(output_path)
+        for name in extra_filenames:
+            extra_path = self._abs_output_dir / f"{name}.png"
+            self._materialize(output_path, extra_path)
+            if self._generated is not None:
+                self._generated.add(extra_path)
+
+    async def agenerate_diagram(
+        self,
+        diagram_code: str,
+        output_filename: str = "architecture_diagram",
+        extra_filenames: Tuple[str, ...] = ()
+    ) -> Tuple[bool, Optional[str], Optional[str]]:
+        """Async variant of generate_diagram for event-loop callers
+
+        The blocking worker hand-off runs on a worker thread so the
+        caller's loop stays free; batch callers can simply gather these.
+        """
+        return await asyncio.to_thread(
+            self.generate_diagram, diagram_code, output_filename, extra_filenames
+        )
+
+    async def agenerate_diagrams(
+        self,
+        jobs: list[Tuple[str, str]]
+    ) -> list[Tuple[bool, Optional[str], Optional[str]]]:
+        """Render several diagrams concurrently from an event loop"""
+        return await asyncio.gather(*(
+            self.agenerate_diagram(code, filename) for code, filename in jobs
+        ))
+
+    def generate_diagrams(
+        self,
+        jobs: list[Tuple[str, str]],
+        max_workers: int = 8
+    ) -> list[Tuple[bool, Optional[str], Optional[str]]]:
+        """
+        Render several diagrams concurrently across the worker pool
+
+        Args:
+            jobs: List of (diagram_code, output_filename) tuples
+            max_workers: Upper bound on concurrent dispatch threads
+
+        Returns:
+            List of (success, output_path, error_message) tuples in job order
+        """
+        if not jobs:
+            return []
+
+        # Each dispatch thread just feeds a pool worker and waits on its
+        # status line, so threads stay I/O-bound and cheap
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(max_workers, len(jobs))
+        ) as executor:
+            futures = [
+                executor.submit(self.generate_diagram, code, filename)
+                for code, filename in jobs
+            ]
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def _materialize(cache_path: Path, output_path: Path):
+        """Expose a cached PNG under the requested output name"""
+        output_path.unlink(missing_ok=True)
+        try:
+            # Zero-copy on the same filesystem
+            os.link(cache_path, output_path)
+        except OSError:
+            shutil.copyfile(cache_path, output_path)
+
+    def _store_in_cache(self, output_path: Path, cache_path: Path):
+        """Record a freshly rendered PNG in the cache, evicting the oldest"""
+        try:
+            os.link(output_path, cache_path)
+        except OSError:
+            try:
+                shutil.copyfile(output_path, cache_path)
+            except OSError:
+                return  # cache is best-effort
+
+        entries = sorted(self._cache_dir.glob("*.png"), key=lambda p: p.stat().st_mtime)
+        for stale in entries[:-_CACHE_MAX_ENTRIES]:
+            stale.unlink(missing_ok=True)
+
     def _prepare_code(self, diagram_code: str, output_filename: str) -> str:
         """
         Prepare the diagram code for execution
 
         Ensures proper imports and output configuration
         """
-        lines = diagram_code.strip().split('\n')
-        prepared_lines = []
-
-        # Track if we've found the Diagram constructor
-        diagram_found = False
-
-        for line in lines:
-            # Look for Diagram constructor and modify it
-            if 'Diagram(' in line and not diagram_found:
-                # Extract the diagram name if present
-                if 'name=' in line:
-                    # Keep the original line but ensure it has the right filename
-                    modified_line = line
-                    if 'filename=' not in line:
-                        # Add filename parameter before the closing parenthesis
-                        modified_line = modified_line.rstrip()
-                        if modified_line.endswith('):'):
-                            modified_line = modified_line[:-2] + f', filename="{output_filename}"):'
-                        elif modified_line.endswith(')'):
-                            modified_line = modified_line[:-1] + f', filename="{output_filename}")'
-                    prepared_lines.append(modified_line)
-                else:
-                    # Add both name and filename
-                    modified_line = line.replace(
-                        'Diagram(',
-                        f'Diagram(name="Architecture Diagram", filename="{output_filename}", '
-                    )
-                    prepared_lines.append(modified_line)
-                diagram_found = True
-            else:
-                prepared_lines.append(line)
+        return _prepare_code(diagram_code, output_filename)
 
-        return '\n'.join(prepared_lines)
+    def _generated_set(self) -> set:
+        """The set of generated diagram paths, scanned once then kept current"""
+        if self._generated is None:
+            with os.scandir(self._abs_output_dir) as entries:
+                self._generated = {
+                    self._abs_output_dir / entry.name
+                    for entry in entries
+                    if entry.name.endswith(".png") and entry.is_file(follow_symlinks=False)
+                }
+        return self._generated
 
     def list_generated_diagrams(self) -> list[str]:
         """List all generated diagram files"""
-        return [
-            str(f)
-            for f in self.output_dir.glob("*.png")
-        ]
+        return [str(f) for f in self._generated_set()]
 
     def clear_outputs(self):
         """Clear all generated diagrams"""
-        for file in self.output_dir.glob("*.png"):
-            file.unlink()
+        for file in self._generated_set():
+            file.unlink(missing_ok=True)
+        self._generated.clear()
+
+
+# Matches the first Diagram(...) constructor call; compiled once so code
+# preparation is a single C-level substitution rather than a Python line loop
+_DIAGRAM_RE = re.compile(r'Diagram\(([^)]*)\)')
+
+# Matches a filename argument (quoted or bare) so a model-chosen value can
+# be redirected to the output target
+_FILENAME_ARG_RE = re.compile(r'filename\s*=\s*("[^"]*"|\'[^\']*\'|[^,)\s]+)')
+
+
+@lru_cache(maxsize=128)
+def _prepare_code(diagram_code: str, output_filename: str) -> str:
+    """Rewrite the Diagram(...) call to target output_filename
+
+    Memoized since regenerations and batch jobs frequently re-prepare
+    identical code.
+    """
+    # Already targeting exactly the output path: skip the rewrite entirely
+    if f'filename="{output_filename}"' in diagram_code:
+        return diagram_code
+
+    def _rewrite(match: "re.Match[str]") -> str:
+        args = match.group(1)
+        if _FILENAME_ARG_RE.search(args):
+            # Redirect whatever filename the model picked to the output
+            # target: workers run in the parent's cwd, so a relative name
+            # would land outside the output directory and never be found
+            args = _FILENAME_ARG_RE.sub(
+                lambda _: f'filename="{output_filename}"', args, count=1
+            )
+            return f'Diagram({args})'
+        if 'name=' in args:
+            # Add filename parameter before the closing parenthesis
+            return f'Diagram({args}, filename="{output_filename}")'
+        # Add both name and filename
+        return f'Diagram(name="Architecture Diagram", filename="{output_filename}", {args})'
+
+    prepared, _ = _DIAGRAM_RE.subn(_rewrite, diagram_code.strip(), count=1)
+    return prepared
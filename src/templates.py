@@ -1,6 +1,8 @@
 """
 Pre-built templates for common architecture patterns
 """
+import sys
+import types
 
 ARCHITECTURE_TEMPLATES = {
     "Three-Tier Web Application (AWS)": {
@@ -54,11 +56,30 @@ ARCHITECTURE_TEMPLATES = {
 }
 
 
-def get_template_names() -> list[str]:
-    """Get list of available template names"""
-    return list(ARCHITECTURE_TEMPLATES.keys())
+# Parse once at import: each template gains a components_list tuple so
+# downstream code never re-splits the comma-separated string, and the
+# enum-like fields are interned so comparisons are pointer checks
+for _template in ARCHITECTURE_TEMPLATES.values():
+    _template["components_list"] = tuple(c.strip() for c in _template["components"].split(","))
+    _template["architecture_type"] = sys.intern(_template["architecture_type"])
+    _template["cloud_provider"] = sys.intern(_template["cloud_provider"])
+del _template
 
+# Frozen at import time: callers share one immutable name tuple and
+# read-only template views instead of fresh allocations per call
+_TEMPLATE_NAMES: tuple[str, ...] = tuple(ARCHITECTURE_TEMPLATES)
+ARCHITECTURE_TEMPLATES = types.MappingProxyType({
+    name: types.MappingProxyType(template)
+    for name, template in ARCHITECTURE_TEMPLATES.items()
+})
+_EMPTY_TEMPLATE = types.MappingProxyType({})
 
-def get_template(name: str) -> dict:
+
+def get_template_names() -> tuple[str, ...]:
+    """Get the available template names"""
+    return _TEMPLATE_NAMES
+
+
+def get_template(name: str) -> types.MappingProxyType:
     """Get a specific template by name"""
-    return ARCHITECTURE_TEMPLATES.get(name, {})
+    return ARCHITECTURE_TEMPLATES.get(name, _EMPTY_TEMPLATE)